@@ -160,6 +160,8 @@ Major Updates:
 # Implementation
 #----------------
 #
+import atexit
+import functools
 import numpy
 import os
 
@@ -188,6 +190,10 @@ ordinalVersionNumber = {'1446ABC':(0,0),'9BEADBE':(1,0),'2FDC90':(2,1),
                         'FE6412C3':(19,3)
                         }
 #
+# The most recent firmware version; used when a sha is missing or unknown
+#
+latestSha = max( ordinalVersionNumber , key=ordinalVersionNumber.get )
+#
 # The default version number is used by spectral and location parsing routines
 # as default compatibility number if none is given
 #
@@ -199,11 +205,30 @@ defaultIIRWeightType = 0
 #
 applyPhaseCorrection                  = True
 applyPhaseCorrectionFromVersionNumber = 2
+#
+# Line prefixes of spectral (SPC) lines that are retained when concatenating;
+# note that SPECA also covers the SPECA_CC lines
+#
+spectralLinePrefixes = (b'SPEC_AVG',b'SPECA')
+
+#
+# Spectral variable names as used in the output, keyed by their lower case
+# name and its irrelevant permutations (Cxz vs Czx)
+#
+spectralKeyNames = {'szz':'Szz','syy':'Syy','sxx':'Sxx',
+                    'cxz':'Cxz','czx':'Cxz','qxz':'Qxz','qzx':'Qxz',
+                    'cyz':'Cyz','czy':'Cyz','qyz':'Qyz','qzy':'Qyz',
+                    'cxy':'Cxy','cyx':'Cxy','qxy':'Qxy','qyx':'Qxy',
+                    'a1':'a1','b1':'b1','a2':'a2','b2':'b2'}
     
 
 class Spectrum:
     _parser_files = {'Szz':'Szz.csv', 'a1':'a1.csv', 'b1':'b1.csv','Sxx':'Sxx.csv','Syy':'Syy.csv','Qxz':'Qxz.csv','Qyz':'Qyz.csv'}
     _toDeg = 180. / numpy.pi
+    _jstart = 3
+    # Combined size (bytes) of the parser output above which it is read in
+    # parallel processes; below it starting the pool costs more than it saves
+    _parallel_load_size = 32 * 1024**2
 
     def __init__(self,path,outpath):
 
@@ -214,15 +239,15 @@ class Spectrum:
         self._data = {'Szz':None,'a1':None,'b1':None,'Sxx':None,'Syy':None,'Qxy':None,'Qyz':None}
         self._none = None
         self.time  = None
+        self._peakIndex = None
+        self._means = {}
+        self._weights = None
+        self._m0 = None
+        # Check which output from the parser is available
+        present = { entry.name for entry in os.scandir(self.path) if entry.is_file() }
         for key in self._parser_files:
             #
-            # Check which output from the parser is available
-            if os.path.isfile(os.path.join(self.path,self._parser_files[key])):
-
-                self._file_available[key] = True
-
-            else:
-                self._file_available[key] = False
+            self._file_available[key] = self._parser_files[key] in present
 
         #Load a header file from the spectral data from the parser to get frequencies
         self._load_header()
@@ -241,25 +266,29 @@ class Spectrum:
     def b1(self):
         return self._data['b1']
 
-    def _Qyzm(self):
+    def _datamean(self,key):
+        #
+        # Frequency averages of the spectral variables are used repeatedly
+        # (a1m, b1m); compute each of them only once
         import  numpy
-        return numpy.mean( self._data['Qyz'],1 )
+        if key not in self._means:
+            self._means[key] = numpy.mean( self._data[key],1 )
+        return self._means[key]
+
+    def _Qyzm(self):
+        return self._datamean('Qyz')
 
     def _Qxzm(self):
-        import  numpy
-        return numpy.mean( self._data['Qxz'],1 )
+        return self._datamean('Qxz')
 
     def _Sxxm(self):
-        import  numpy
-        return numpy.mean( self._data['Sxx'],1 )
+        return self._datamean('Sxx')
 
     def _Syym(self):
-        import  numpy
-        return numpy.mean( self._data['Syy'],1 )
+        return self._datamean('Syy')
 
     def _Szzm(self):
-        import  numpy
-        return numpy.mean( self._data['Szz'],1 )
+        return self._datamean('Szz')
 
     @property
     def f(self):
@@ -269,9 +298,9 @@ class Spectrum:
         for key in self._parser_files:
             if self._file_available[key]:
                 with open(os.path.join(self.path,self._parser_files[key]),'r') as file:
-                    line = file.readline(  ).split(',')[8:]
-                    self._frequencies = numpy.array([float(x) for x in line])
-            break
+                    line = file.readline(  ).split(',',8)[8]
+                    self._frequencies = numpy.fromstring(line,sep=',')
+                break
         else:
             raise Exception('No spectral files available - please make sure the script is in the same directory as the sd-card output')
 
@@ -280,32 +309,77 @@ class Spectrum:
         #
         import numpy
         import os
-        for key in self._parser_files:
-            if self._file_available[key]:
-                data = numpy.loadtxt( os.path.join(self.path,self._parser_files[key]) , delimiter=',' )
-                self.time = data[ : , 0:8 ]
-                self._data[key] = data[:,8:]
-                mask = numpy.isnan( self._data[key] )
-                self._data[key][mask] = 0.
-                self._none = numpy.nan + numpy.zeros( self._data[key].shape )
+        import concurrent.futures
+        #
+        # The parser output files are independent; for large output on a
+        # multi-core machine parse them in parallel (np.loadtxt holds the GIL,
+        # so this needs processes rather than threads)
+        #
+        keys    = [ key for key in self._parser_files if self._file_available[key] ]
+        paths   = [ os.path.join(self.path,self._parser_files[key]) for key in keys ]
+        loadtxt = functools.partial( numpy.loadtxt , delimiter=',' )
+        workers = min( len(paths) , os.cpu_count() or 1 )
+        size    = sum( os.path.getsize(path) for path in paths )
+        if workers > 1 and size > self._parallel_load_size:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                loaded = list( executor.map( loadtxt , paths ) )
+        else:
+            loaded = [ loadtxt( path ) for path in paths ]
 
+        for key,data in zip( keys , loaded ):
+            self.time = data[ : , 0:8 ]
+            self._data[key] = data[:,8:]
+            numpy.nan_to_num( self._data[key] , copy=False , nan=0. ,
+                              posinf=numpy.inf , neginf=-numpy.inf )
+            shape = self._data[key].shape
+
+        # Missing variables all share a read-only, all-NaN view
+        self._none = numpy.broadcast_to( numpy.nan , shape )
         for key in self._parser_files:
             if not self._file_available[key]:
                 self._data[key] = self._none
 
 
+    def _trapezoidal_weights(self):
+        #
+        # Weights of the trapezoidal rule on the frequency grid (excluding the
+        # first jstart frequencies), so that a moment is a single dot product
+        import numpy
+        if self._weights is None:
+            df = numpy.diff( self.f[self._jstart:] )
+            self._weights = numpy.zeros( len(self.f) - self._jstart )
+            self._weights[:-1] += df / 2
+            self._weights[1:]  += df / 2
+        return self._weights
+
     def _moment(self , values ):
         import numpy
 
-        df = numpy.mean(numpy.diff( self.f))
-        E = self.Szz * values
-        jstart =3
-        return numpy.trapz(  E[:,jstart:],self.f[jstart:] ,1  )
+        jstart  = self._jstart
+        weights = self._trapezoidal_weights()
+        values  = numpy.asarray( values )
+        if values.ndim > 0:
+            values = values[...,jstart:]
+        #
+        # Scalar and frequency-only values are folded into the weights; for
+        # time-varying values the product and the sum are done in one pass.
+        # Either way no temporary copy of the spectrum is made.
+        if values.ndim < 2:
+            return numpy.dot( self.Szz[:,jstart:] , weights * values )
+        else:
+            return numpy.einsum( 'ij,ij,j->i' , self.Szz[:,jstart:] , values , weights )
+
+    def _zeroth_moment(self):
+        # The zeroth moment (variance) is needed for the wave height and to
+        # normalize all weighted moments; compute it once
+        if self._m0 is None:
+            self._m0 = self._moment(1.)
+        return self._m0
 
     def _weighted_moment(self , values ):
         import numpy
 
-        return self._moment( values ) / self._moment(1.)
+        return self._moment( values ) / self._zeroth_moment()
 
     @property
     def a1m(self):
@@ -324,19 +398,16 @@ class Spectrum:
 
     def _peak_index(self):
         import numpy
-        return numpy.argmax( self.Szz,1 )
+        if self._peakIndex is None:
+            self._peakIndex = numpy.argmax( self.Szz,1 )
+        return self._peakIndex
 
     def _direction(self,a1,b1):
         import numpy
         directions = 270 - numpy.arctan2( b1 , a1 ) * self._toDeg
 
-        for ii,direction in enumerate(directions):
-            if direction < 0:
-                direction = direction + 360
-
-            if direction > 360:
-                direction = direction - 360
-            directions[ii] = direction
+        directions[ directions < 0   ] += 360
+        directions[ directions > 360 ] -= 360
         return directions
 
     def mean_direction(self):
@@ -344,24 +415,19 @@ class Spectrum:
 
     def _spread(self,a1,b1):
         import numpy
-        return numpy.sqrt(  2 - 2 * numpy.sqrt( a1**2 + b1**2 ) ) * self._toDeg
+        # clip roundoff (or noise) that would make the argument negative
+        return numpy.sqrt( numpy.clip( 2 - 2 * numpy.hypot( a1 , b1 ) , 0. , None ) ) * self._toDeg
 
     def mean_spread(self):
         return self._spread(self.a1m,self.b1m )
 
     def _get_peak_value(self, variable ):
-        maxloc = numpy.argmax( self.Szz,1 )
-
-        out = numpy.zeros( maxloc.shape )
+        maxloc = self._peak_index()
 
         if len(variable.shape) == 2:
-            for ii,index in enumerate( maxloc ):
-                out[ii] = variable[ ii,index ]
+            return variable[ numpy.arange( maxloc.shape[0] ) , maxloc ]
         elif len(variable.shape) == 1:
-            for ii, index in enumerate(maxloc):
-                out[ii] = variable[index]
-
-        return out
+            return variable[ maxloc ]
 
     def peak_direction(self):
         a1 = self._get_peak_value( self.a1 )
@@ -384,9 +450,10 @@ class Spectrum:
 
     def significant_wave_height(self):
         import numpy
-        return 4.*numpy.sqrt(self._moment( 1.))
+        return 4.*numpy.sqrt(self._zeroth_moment())
 
     def generate_text_file(self):
+        import numpy
         import os
         hm0   = self.significant_wave_height()
         tm01  = self.mean_period()
@@ -396,21 +463,12 @@ class Spectrum:
         dspr  = self.mean_spread()
         pdspr = self.peak_spreading()
 
-        with open(os.path.join( self.outpath,'bulkparameters.csv'),'w') as file:
-
-            header = "# year , month , day, hour ,min, sec, milisec , Significant Wave Height, Mean Period, Peak Period, Mean Direction, Peak Direction, Mean Spreading, Peak Spreading\n"
-            file.write(header)
-            format = '%d, ' * 7 + '%6.2f, ' * 6 + '%6.2f \n'
-            for ii in range( 0 , len(hm0)):
-                #
-                string = format % ( self.time[ii,0], self.time[ii,1],  self.time[ii,2],
-                                    self.time[ii,3],self.time[ii,4],self.time[ii,5],
-                                    self.time[ii,6],hm0[ii],tm01[ii],tp[ii],
-                                    dir[ii],pdir[ii],dspr[ii],pdspr[ii]  )
-                file.write( string )
-                #
-            #
-        #
+        header = "year , month , day, hour ,min, sec, milisec , Significant Wave Height, Mean Period, Peak Period, Mean Direction, Peak Direction, Mean Spreading, Peak Spreading"
+        format = '%d, ' * 7 + '%6.2f, ' * 6 + '%6.2f '
+        data   = numpy.column_stack( ( self.time[:,0:7],hm0,tm01,tp,
+                                       dir,pdir,dspr,pdspr ) )
+        writeCSV( os.path.join( self.outpath,'bulkparameters.csv'), data,
+                  fmt=format, header=header )
 
 def main( path = None , outpath=None, outputFileType='CSV',
           spectra='all',suffixes=None,parsing=None,lfFilter=False,bulkParameters=True):
@@ -538,6 +596,15 @@ def main( path = None , outpath=None, outputFileType='CSV',
                             versionNumber=version['number'],
                             IIRWeightType=version['IIRWeightType'])
                     #
+                    # for binary/compressed output the concatenated text
+                    # file is only an intermediate (for csv it has just
+                    # been overwritten in place, and for pickle no other
+                    # output is written, so it is kept)
+                    if outputFileType.lower() in ['gz','matlab','numpy']:
+                        #
+                        os.remove( fileName )
+                        #
+                    #
                 elif suffix in ['SPC']:
                     #
                     #parse the mean location/displacement files; this step 
@@ -567,15 +634,17 @@ def main( path = None , outpath=None, outputFileType='CSV',
 
 
 def log_errors( error ):
-    global First
-    if First:
-        with open( 'error.txt','w') as file:
-            file.write(error + '\n')
-        First = False
-    else:
-        with open( 'error.txt','a') as file:
-            file.write(error + '\n')
-        First = False
+    #
+    # error.txt is created on the first error and kept open for subsequent
+    # errors; it is closed when the interpreter exits. Every message is
+    # flushed so that it is on disk immediately.
+    #
+    global errorFile
+    if errorFile is None:
+        errorFile = open( 'error.txt','w')
+        atexit.register(errorFile.close)
+    errorFile.write(error + '\n')
+    errorFile.flush()
 
 def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
          kind='FLT', reportProgress=True, outputFileType='CSV',
@@ -611,9 +680,9 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
         # Read the data using pandas, and convert to numpy
         #
         data = pd.read_csv( inputFileName ,
-                index_col=False , usecols=(1,2,3,4) )
-        data = data.apply(pd.to_numeric,errors='coerce')
-        data = data.values
+                index_col=False , usecols=(1,2,3,4),
+                memory_map=True , low_memory=False )
+        data = toNumericArray( data )
 
         msk = np.isnan( data[:,0] ) | np.isnan( data[:,1] ) | np.isnan( data[:,2] ) | np.isnan( data[:,3] )
         data = data[~msk,:]
@@ -625,10 +694,9 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
         if applyPhaseCorrection and versionNumber>=applyPhaseCorrectionFromVersionNumber:
             #
             print('- IIR phase correction using weight type: ', str(IIRWeightType ) )
-            for ii in range(0,3):
-                #
-                data[:,ii] = applyfilter( data[:,ii] , 'backward' , versionNumber, IIRWeightType )
-                #
+            #
+            # x, y and z are filtered in a single call (along axis 0)
+            data = applyfilter( data , 'backward' , versionNumber, IIRWeightType )
             #        
         data        = np.concatenate( (datetime,data) , axis=1 )
             
@@ -639,9 +707,9 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
         # Read the data using pandas, and convert to numpy
         #
         data = pd.read_csv(inputFileName,
-                           index_col=False, usecols=(0, 1))
-        data = data.apply(pd.to_numeric,errors='coerce')
-        data = data.values
+                           index_col=False, usecols=(0, 1),
+                           memory_map=True, low_memory=False)
+        data = toNumericArray( data )
 
         msk = np.isnan(data[:, 0])
         data = data[~msk, :]
@@ -657,10 +725,10 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
         #
         #
         data = pd.read_csv( inputFileName ,
-                index_col=False , usecols=(1,2,3,4,5,6,7,8,9))
-        data = data.apply(pd.to_numeric,errors='coerce')
-        data = data.values
-        datetime    = epochToDateArray(data[:,0].tolist())
+                index_col=False , usecols=(1,2,3,4,5,6,7,8,9),
+                memory_map=True , low_memory=False )
+        data = toNumericArray( data )
+        datetime    = epochToDateArray(data[:,0])
 
         data[:,1]  = data[:,1] + data[:,2] / 6000000.
         data[:,2]  = data[:,3] + data[:,4] / 6000000.
@@ -675,12 +743,12 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
     else:
         #
         data = pd.read_csv( inputFileName ,
-                index_col=False , usecols=(0,1,2,3,4))
-        data = data.apply(pd.to_numeric,errors='coerce')
-        data = data.values
+                index_col=False , usecols=(0,1,2,3,4),
+                memory_map=True , low_memory=False )
+        data = toNumericArray( data )
         msk = np.isnan(data[:, 0])
         data = data[~msk, :]
-        datetime    = epochToDateArray(data[:,0].tolist())
+        datetime    = epochToDateArray(data[:,0])
 
         data[:,1]  = data[:,1] + data[:,2] / 6000000.
         data[:,2]  = data[:,3] + data[:,4] / 6000000.
@@ -695,7 +763,13 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
     
 
 
-    if outputFileType.lower() in ['csv','gz']:
+    if outputFileType.lower()=='csv':
+        #
+        writeCSV(outputFileName , data , fmt=fmt , header=header)
+        #
+    elif outputFileType.lower()=='gz':
+        #
+        # savetxt compresses based on the .gz extension
         #
         np.savetxt(outputFileName ,
             data ,fmt=fmt,
@@ -760,13 +834,80 @@ def parseLocationFiles( inputFileName=None, outputFileName='displacement.CSV',
     #
 #end def
 
+def toNumericArray( data ):
+    #
+    # Convert a dataframe read from a Spotter file into a float array. Columns
+    # the C parser already read as numbers are converted as is; only columns
+    # that contain bad data (strings etc.) are coerced, with the offending
+    # entries set to NaN.
+    #
+    import numpy as np
+    import pandas as pd
+
+    bad = [ column for column,dtype in data.dtypes.items()
+            if not pd.api.types.is_numeric_dtype(dtype) ]
+    if bad:
+        #
+        data[bad] = data[bad].apply(pd.to_numeric,errors='coerce')
+        #
+    #
+    return( data.to_numpy( dtype=np.float64 ) )
+#
+
+def readCSV( fileName, usecols, skiprows=None, rowsPerChunk=10000 ):
+    #
+    # Read the given columns of a comma delimited file into a float array
+    # (see toNumericArray). The file is parsed in chunks of rows that are
+    # copied into a preallocated array, so that peak memory is the final array
+    # plus one chunk, instead of twice the final array.
+    #
+    import numpy as np
+    import pandas as pd
+
+    #
+    # The number of lines is an upper bound on the number of rows
+    #
+    with open( fileName , 'rb' ) as file:
+        #
+        numberOfLines = 1 + sum( [ block.count(b'\n') for block in
+                                   iter( lambda: file.read(1<<24) , b'' ) ] )
+        #
+    #
+    data = np.empty( ( numberOfLines , len(usecols) ) )
+    row  = 0
+    for chunk in pd.read_csv( fileName ,
+                index_col=False , skiprows=skiprows,  header=None,
+                    usecols=usecols,
+                    memory_map=True , chunksize=rowsPerChunk ):
+        #
+        data[ row : row + chunk.shape[0] , : ] = toNumericArray( chunk )
+        row = row + chunk.shape[0]
+        #
+    #
+    return( data[ 0:row , : ] )
+#
+
 def epochToDateArray( epochtime ):
+    #
+    # Convert an array-like of unix epochs to an array with columns
+    # year, month, day, hour, min, sec, milisec (UTC)
     #
     import numpy as np
-    import time
-    
-    datetime   = np.array( [ list(time.gmtime(x))[0:6] for x in epochtime ])
-    milis      = np.array( [ ( 1000 * (  x-np.floor(x) ) ) for x in epochtime ])
+    import pandas as pd
+
+    epochtime = np.asarray( epochtime , dtype=np.float64 )
+    if epochtime.ndim != 1:
+        #
+        raise TypeError('epochtime should be a one dimensional array-like')
+        #
+    #
+    # Convert whole seconds in one go, so that - like time.gmtime - the
+    # seconds are truncated
+    seconds    = np.floor( epochtime )
+    date       = pd.DatetimeIndex( pd.to_datetime( seconds , unit='s' ) )
+    datetime   = np.column_stack( ( date.year , date.month , date.day ,
+                                    date.hour , date.minute, date.second ) )
+    milis      = 1000 * (  epochtime - seconds )
     return(np.concatenate( (datetime,milis[:,None]),axis=1))
 #
     
@@ -784,34 +925,15 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
     # (*outputFileName*).
     #
     import os
-    import pandas as pd
     import numpy as np
     import time
     
     def checkKeyNames(key,errorLocation):
         # Nested function to make sure input is insensitive to capitals,
         # irrelevant permutations (Cxz vs Czx), etc
-        if key.lower() == 'szz':
-            out = 'Szz'
-        elif key.lower() == 'syy':
-            out = 'Syy'
-        elif key.lower() == 'sxx':
-            out = 'Sxx'                
-        elif key.lower() in ['cxz','czx']:
-            out = 'Cxz'
-        elif key.lower() in ['qxz','qzx']:
-            out = 'Qxz'
-        elif key.lower() in ['cyz','czy']:
-            out = 'Cyz'
-        elif key.lower() in ['qyz','qzy']:
-            out = 'Qyz'
-        elif key.lower() in ['cxy','cyx']:
-            out = 'Cxy'                
-        elif key.lower() in ['qxy','qyx']:
-            out = 'Qxy'
-        elif key.lower() in ['a1','b1','a2','b2']:
-            out = key.lower()
-        else:
+        try:
+            out = spectralKeyNames[ key.lower() ]
+        except KeyError:
             raise Exception('unknown key: ' + key + ' in ' + errorLocation)
         return(out)
     #end def
@@ -897,30 +1019,53 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
         stride = 16
         #
     #
-    # Read csv file using Pandas - this is the only section in the code
-    # still reliant on Pandas, and only there due to supposed performance
-    # benifits.
-    tmp = pd.read_csv( inputFileName ,
-                index_col=False , skiprows=[0],  header=None,
-                    usecols=tuple(range(2,5+stride*nf)) )
+    # Only the spectral variables needed for the requested output are read;
+    # the directional moments derive from the (co/quad) spectra, and the
+    # low frequency filter rescales all of them
+    #
+    moments = ['a1','b1','a2','b2']
+    if lfFilter:
+        #
+        needed = list( startColumnNumber )
+        #
+    else:
+        #
+        needed = [ key for key in outputSpectra if key not in moments ]
+        if any( [ x in moments for x in outputSpectra ] ):
+            #
+            needed = needed + ['Szz','Sxx','Syy','Qxz','Qyz','Cxy']
+            #
+        #
+    #
+    offsets = sorted( set( [ startColumnNumber[key] - 3 for key in needed ] ) )
+    usecols = [2,3,4] + [ 5 + ii * stride + offset
+                          for ii in range( 0 , nf ) for offset in offsets ]
     
-    # Ensure the dataframe is numeric, coerce any occurences of bad data
+    # Read only the needed columns of the csv file, in chunks of rows
+    # (readCSV).
+    #
+    # Ensure the data is numeric, coerce any occurences of bad data
     # (strings etc) to NaN and return a numpy numerica array
-    tmp = tmp.apply(pd.to_numeric, errors='coerce').values
+    tmp = readCSV( inputFileName , usecols=usecols , skiprows=[0] )
       
     datetime    = epochToDateArray(tmp[:,0])
     ensembleNum = tmp[:,2] * 2
+    #
+    # The spectral columns are interleaved per frequency; reshape them to
+    # (variable, time, frequency) so that each variable is a contiguous block,
+    # and convert to variance density and change units to m2/hz (instead
+    # of mm^2/hz) in a single pass. The low frequency columns are set to NaN
+    # directly and are not converted.
+    #
+    spectra = np.empty( ( len(offsets) , tmp.shape[0] , nf ) )
+    spectra[ : , : , 0:3 ] = np.nan
+    np.divide( tmp[ : , 3: ].reshape( tmp.shape[0], nf, len(offsets)
+                                    )[ : , 3: , : ].transpose( 2, 0, 1 ),
+               1000000. * df , out=spectra[ : , : , 3: ] )
     data = {}
-    for key in startColumnNumber:
+    for key in needed:
         #
-        # Convert to variance density and change units to m2/hz (instead
-        # of mm^2/hz)
-        #
-        data[key] = tmp[: , startColumnNumber[key]::stride ]/( 1000000. * df )
-        #
-        # Set low frequency columns to NaN
-        #
-        data[key][:,0:3] = np.nan
+        data[key] = spectra[ offsets.index( startColumnNumber[key] - 3 ) ]
         #
             
     # Calculate directional moments from data (if requested). Because these are
@@ -929,23 +1074,28 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
         #
         with np.errstate(invalid='ignore',divide='ignore'):
             #Supress divide by 0; silently produce NaN
-            data['a1'] = data['Qxz'] / np.sqrt( ( data['Szz'] * (
-                data['Sxx'] + data['Syy'] ) ) )
-            data['a2'] = ( data['Sxx'] - data['Syy'] ) / (
-                data['Sxx'] + data['Syy'] )
-            data['b1'] = data['Qyz'] / np.sqrt( ( data['Szz'] * (
-                data['Sxx'] + data['Syy'] ) ) )
-            data['b2'] = 2. * data['Cxy'] /  (
-                data['Sxx'] + data['Syy'] )                      
+            #
+            # The horizontal energy and normalization are shared between
+            # the moments, compute them once; the remaining arithmetic is
+            # done in place to avoid temporaries
+            Shh  = data['Sxx'] + data['Syy']
+            norm = data['Szz'] * Shh
+            np.sqrt( norm , out=norm )
+            data['a1'] = data['Qxz'] / norm
+            data['a2'] = data['Sxx'] - data['Syy']
+            data['a2'] /= Shh
+            data['b1'] = data['Qyz'] / norm
+            data['b2'] = 2. * data['Cxy']
+            data['b2'] /= Shh
         #
 
         for key in ['a1','b1','a2','b2']:
             #
             # If energies are zeros, numpy produces infinities
-            # set to NaN as these are meaningless
+            # set to NaN as these are meaningless (in place, NaN is kept)
             #
-            data[key][ np.isinf(data[key] ) ]= np.nan
-            data[key][ np.isnan(data[key] ) ]= np.nan
+            np.nan_to_num( data[key] , copy=False , nan=np.nan ,
+                           posinf=np.nan , neginf=np.nan )
     #
 
     if lfFilter:
@@ -955,40 +1105,46 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
         #
     #
         
-    for key in data:
-        #
-        data[key] = np.concatenate( (datetime,
-                                         ensembleNum[:,None],data[key]),axis=1 )
-        #
-    #
-
     # construct header for use in CSV
     header = 'year,month,day,hour,min,sec,milisec,dof'
     freq = np.array(list( range( 0 , nf ) )) * df
-    #
-    for f in freq:
-        #        
-        header = header +','+ str(f)
-        #    
-    #
+    header = ','.join( [ header ] + [ str(f) for f in freq ] )
         
     #
     # write data to requested output format
     #
+    fileType = outputFileType.lower()
+    fmt = '%i , ' * 8 + ('%.3e , ' * (nf-1)) + '%.3e'
+    if fileType=='csv':
+        #
+        # The time and dof columns are the same for all variables; fill them
+        # once in an output table whose spectral block is overwritten for
+        # each variable
+        table = np.empty( ( datetime.shape[0] , 8 + nf ) )
+        table[ : , 0:7 ] = datetime
+        table[ : , 7   ] = ensembleNum
+        #
+    elif fileType in ['matlab','numpy']:
+        #
+        # time, dof and frequencies are the same for all variables
+        timeArray   = datetime.astype(np.int16)
+        dofArray    = ensembleNum.astype(np.int16)
+        frequencies = freq.astype(np.float32)
+        #
+    #
     for key in outputSpectra:
         #
-        fmt = '%i , ' * 8 + ('%.3e , ' * (nf-1)) + '%.3e'
-
-        if outputFileType.lower()=='csv':
+        if fileType=='csv':
             #
-            if outputFileType.lower() in ['csv','gz']:
+            if fileType in ['csv','gz']:
                 #
-                np.savetxt(os.path.join( outputPath , outputFileName[key]) ,
-                           data[key], fmt=fmt,
-                           header=header)
+                table[ : , 8: ] = data[key]
+                writeCSV(os.path.join( outputPath , outputFileName[key]) ,
+                         table, fmt=fmt,
+                         header=header)
                 #            
             #
-        elif outputFileType.lower()=='matlab':
+        elif fileType=='matlab':
             #
             # To save to matlab .mat format we need scipy
             #
@@ -996,27 +1152,25 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
                 import scipy
                 from scipy import io                
                 #
-                mat = data[key]
                 scipy.io.savemat(
                         os.path.join( outputPath , outputFileName[key]),
-                        {'spec':mat[:,8:].astype(np.float32),
-                        'time':mat[:,0:7].astype(np.int16),
-                        'frequencies':freq.astype(np.float32),
-                        'dof':mat[:,7].astype(np.int16) } )
+                        {'spec':data[key].astype(np.float32),
+                        'time':timeArray,
+                        'frequencies':frequencies,
+                        'dof':dofArray } )
                 #
             except ImportError:
                 #
                 raise Exception('Saving as a matfile requires Scipy')
                 #
             #
-        elif outputFileType.lower()=='numpy':
+        elif fileType=='numpy':
             #
-            mat = data[key]         
             np.savez(os.path.join( outputPath , outputFileName[key]),
-                        spec=mat[:,8:].astype(np.float32),
-                        time=mat[:,0:7].astype(np.int16),
-                        frequencies=freq.astype(np.float32),
-                        dof=mat[:,7].astype(np.int16) )
+                        spec=data[key].astype(np.float32),
+                        time=timeArray,
+                        frequencies=frequencies,
+                        dof=dofArray )
             #
         #
     #
@@ -1025,6 +1179,35 @@ def parseSpectralFiles(   inputFileName=None, outputPath = None,
     #
 #end def
 
+def writeCSV( fileName, data, fmt, header, rowsPerBlock=1000 ):
+    #
+    # Write a 2D numeric array as comma delimited text; the output is the same
+    # as that of np.savetxt(fileName,data,fmt=fmt,header=header), but rows
+    # are formatted and written in blocks of rows through a large buffer,
+    # instead of one write per row.
+    #
+    # The row format is repeated once for a full block, so that each block is
+    # formatted by a single % operation on the flattened rows.
+    #
+    fmt      = fmt + '\n'
+    blockFmt = fmt * rowsPerBlock
+    with open( fileName , 'w' , buffering=1<<20 ) as file:
+        #
+        file.write( '# ' + header + '\n' )
+        for start in range( 0 , data.shape[0] , rowsPerBlock ):
+            #
+            rows = data[ start : start + rowsPerBlock ]
+            if rows.shape[0] < rowsPerBlock:
+                #
+                blockFmt = fmt * rows.shape[0]
+                #
+            #
+            file.write( blockFmt % tuple( rows.ravel().tolist() ) )
+            #
+        #
+    #
+#end def
+
 def lowFrequencyFilter( data ):
     '''
     function to perform the low-frequency filter
@@ -1033,24 +1216,40 @@ def lowFrequencyFilter( data ):
     #
     with np.errstate(invalid='ignore',divide='ignore'):
         # Ignore division by 0 etc (this is caught below)
-        Gxz = (data['Cxz']**2 + data['Qxz']**2) / ( data['Sxx'] * data['Szz'] )
-        Gyz = (data['Cyz']**2 + data['Qyz']**2) / ( data['Syy'] * data['Szz'] )
         #
-    #
-    phi = 1.5 * np.pi - np.arctan2( data['b1'] , data['a1'] )
-    G   = ( np.sin( phi) **2 * Gxz + np.cos( phi) **2 * Gyz )
+        # G = sin(phi)**2 * Gxz + cos(phi)**2 * Gyz, evaluated in place so
+        # that only a few (N x nf) work arrays are allocated
+        #
+        G   = data['Cxz']**2
+        G  += data['Qxz']**2
+        G  /= data['Sxx'] * data['Szz']
+        Gyz = data['Cyz']**2
+        Gyz+= data['Qyz']**2
+        Gyz/= data['Syy'] * data['Szz']
+        #
+    #
+    phi = np.arctan2( data['b1'] , data['a1'] )
+    np.subtract( 1.5 * np.pi , phi , out=phi )
+    weight = np.sin( phi )
+    weight *= weight
+    G      *= weight
+    np.cos( phi , out=weight )
+    weight *= weight
+    Gyz    *= weight
+    G      += Gyz
     G[ np.isnan(G)] = 0.
 
     I  = np.argmax( G           , axis=1 )
+    #
+    # Only frequencies below the maximum of G are scaled; set G to one for all
+    # others so that each variable can be scaled in one go
+    #
+    np.copyto( G , 1. , where=np.arange( G.shape[1] )[None,:] >= I[:,None] )
 
     names =  ['Szz','Cxz','Qxz','Cyz','Qyz','Sxx','Syy','Cxy','Qxy']
     for key in names:
         #
-        for jj in range( 0 , G.shape[0] ):
-            #
-            data[ key ][ jj , 0 : I[jj] ] = \
-              data[ key ][ jj , 0 : I[jj] ] * G[jj,0 : I[jj]]           
-            #
+        data[ key ] *= G
         #
     #
     return( data )
@@ -1063,7 +1262,6 @@ def getFileNames( path , suffix , message,versionFileList=None ):
     # that conform to ????_YYY.CSV where YYY is given by *suffix*.
     #
     import os
-    import fnmatch
     
     if path is None:
         #
@@ -1077,44 +1275,39 @@ def getFileNames( path , suffix , message,versionFileList=None ):
         #
     #
 
-        
-    synonyms = [suffix]
-    if suffix == 'LOC':
-        #
-        synonyms.append('GPS')
-        #
+
     #
-    # Get the file list from the directory, and select only those files that
-    # match the Spotter output filename signature
+    # Get the file list from the directory in a single pass, and select only
+    # those files that match the Spotter output filename signature
+    # (????_YYY.CSV, ????_YYY.csv or ????_YYY.log). Names are compared after
+    # os.path.normcase so that, as with fnmatch, matching is case insensitive
+    # on platforms with case insensitive filenames (Windows).
     #
-
-    if versionFileList is not None:
+    endings   = tuple( [ os.path.normcase( '_' + suffix + '.' + ext )
+                         for ext in ['CSV','csv','log'] ] )
+    length    = 4 + len( endings[0] )
+    fileNames = []
+    with os.scandir(path) as entries:
         #
-        # Only add filenames that are in the present version file number list
-        #
-        fileNames = []
-        for filename in sorted(os.listdir(path)):
+        for entry in entries:
             #
-            if (fnmatch.fnmatch(filename, '????_' + suffix + '.CSV') or
-                fnmatch.fnmatch(filename, '????_' + suffix + '.csv') or
-                fnmatch.fnmatch(filename, '????_' + suffix + '.log')):
+            name = os.path.normcase( entry.name )
+            if not ( len(name) == length and name.endswith(endings) ):
                 #
-                num , ___ = filename.split('_')
-                num = num.strip()
-                if num in versionFileList:
-                    #
-                    fileNames.append(filename)
-                    #
+                continue
+                #
+            #
+            # Only add filenames that are in the present version file number
+            # list (if given)
+            #
+            if versionFileList is None or name[0:4].strip() in versionFileList:
+                #
+                fileNames.append(entry.name)
                 #
             #
         #
-    else:
-        #
-        fileNames =  [ filename for filename in sorted(os.listdir(path))
-                       if
-                       (fnmatch.fnmatch(filename, '????_' + suffix + '.CSV') or
-                        fnmatch.fnmatch(filename, '????_' + suffix + '.csv') or
-                        fnmatch.fnmatch(filename, '????_' + suffix + '.log'))]
+    #
+    fileNames.sort()
     #
     # Are there valid Spotter files?
     #    
@@ -1144,6 +1337,115 @@ def extensions( outputFileType ):
     #
 #
   
+def modeDetection( path , filename ):
+    #
+    # Here we detect if we are in debug or in production mode, we do this
+    # based on the first few lines; in debug these will contain either
+    # FFT or SPEC, whereas in production only SPECA is encountered
+    import os
+
+    mode = 'production'
+    with open(os.path.join( path,filename) ) as infile:
+        #
+        jline = 0 
+        for line in infile:
+            #
+            if ( line[0:3]=='FFT' or line[0:5]=='SPEC,'):
+                mode = 'debug'
+                break
+            jline = jline+1
+
+            if jline>10:
+                break
+    return(mode)
+#
+
+def catSpectralFile( path, filename, keepHeader ):
+    #
+    # Select the lines of a single SPC file that are retained in the
+    # concatenated spectral file. Returns the retained lines (as bytes) and
+    # whether the file turned out to be corrupt; for a corrupt file only the
+    # lines before the error are retained.
+    # This is a module level function so cat() can run it in worker processes.
+    #
+    import os
+
+    ip = 0
+    prevLine = b''
+    mode = modeDetection( path, filename)
+    #
+    outlines = []
+    corrupt  = False
+    #
+    # Bind names used in the line loop to locals to avoid repeated global and
+    # attribute lookups per line
+    append   = outlines.append
+    prefixes = spectralLinePrefixes
+    with open(os.path.join( path,filename),'rb') as infile:
+        try:        #
+            #lines = infile.readlines()
+            ii = 0
+            line = infile.readline()
+            line.decode('utf-8')
+            #
+            if keepHeader:
+                #
+                append(line)
+
+            for line in infile:
+                #
+                # The lines are kept as bytes, but are still decoded so that
+                # a file with invalid (non UTF-8) bytes is flagged as corrupt,
+                # as it was when the file was read in text mode
+                line.decode('utf-8')
+                #
+                # Read the ensemble counter
+                if line.startswith(prefixes):
+                    ii = int(line.split(b',', 5)[4])
+                    #
+
+                    if mode=='production':
+                        #
+                        append(line)
+                        ip       = ii
+                        #
+                    else:
+                        #
+                        #
+                        # Debug spectral file, contains all averages,
+                        # only need last.
+                        #
+                        if line.startswith(b'SPECA_CC'):
+                            #
+                            append(line)
+                            ip = 0
+                            #
+                        elif ii < ip:
+                            #
+                            append(prevLine)
+                            ip = 0
+                            #
+                        else:
+                            #
+                            ip       = ii
+                            prevLine = line
+                            #
+                        #end if
+                        #
+                    #end if
+                    #
+                #end if
+                #
+            #end for line
+            #
+        except Exception as e:
+            corrupt = True
+    #end with
+    #
+    # Strip dos newline chars
+    return( b''.join(outlines).replace(b'\r',b'') , corrupt )
+#end def
+
 def cat( path = None, outputFileName = 'displacement.CSV', Suffix='FLT',
              reportProgress=True, outputFileType='CSV',versionFileList=None,
             compatibility_version=defaultVersion):
@@ -1167,116 +1469,63 @@ def cat( path = None, outputFileName = 'displacement.CSV', Suffix='FLT',
         tail = tail.replace('SST','FLT')
 
         flt_file = os.path.join(head,tail)
-        data = pd.read_csv( flt_file ,index_col=False , usecols=(0,1))
-        data = data.apply(pd.to_numeric,errors='coerce')
-        data = data.values
-        msk = np.isnan( data[:,0] )
-        for ii in range( 0, data.ndim ):
-            msk = np.isfinite(data[:,ii])
-            data = data[msk,:]
-        data = data[msk,:]
+        data = pd.read_csv( flt_file ,index_col=False , usecols=(0,1),
+                            memory_map=True , low_memory=False )
+        data = toNumericArray( data )
+        # Only keep rows where both millis and epoch are valid
+        data = data[ np.isfinite(data).all(axis=1) , : ]
         millis = data[:,0]
         epochs = data[:,1]
 
-        ii  = numpy.argmax( millis)
+        ii  = int( np.argmax( millis) )
 
         if ii < 10:
             raise Exception('Roll-over in millis')
 
-        def millis_to_epoch(milis_in):
-            return int(epochs[0] + ( milis_in - millis[0] ) \
-                   * ( epochs[ii] - epochs[0] ) / ( millis[ii] - millis[0] ))
-
-        return millis_to_epoch
+        # The relation is linear, and given by two (millis,epoch) points
+        return ( millis[0], epochs[0] ), ( millis[ii], epochs[ii] )
 
     def process_sst_lines( lines, infile ):
-        #
-        # Get the function that maps milis to epochs
         #
         # max int used for roll-over; Spotter millis clock resets after reaching
         # the max ints.
         max = 4294967295
 
         #Get the millis to epoch mapping from the FLT file
-        millis_to_epoch = get_epoch_to_milis_relation(infile)
-
-        # Do a line by line processing, replacing millis with epochtime from
-        # the mapping
-        outlines = []                #Store the output lines
-        previousvalue = 0
-        for line in lines:
-            if 'millis' in line:
-                # header
-                outlines.append(line)
-            else:
-                #
-                data = line.strip().split(',')
-                # last line can be empty, check if there are two entries (as expected)
-                if len(data) == 2:
-
-                    # Look at the delta, millis should be monotonically increasing
-                    # unless we hit roll-over
-                    delta = int(data[0]) - previousvalue
-
-                    # If the delta is negative, wrap the value
-                    if delta < -4294000000:
-                        delta = delta + max
-
-                    # New value from (potentially) corrected delta
-                    value = previousvalue + delta
-
-                    #Convert to epochtime from mapping
-                    epoch = millis_to_epoch( value )
-                    outlines.append(str( epoch ) + ' , ' + data[1])
-                    previousvalue = value
-                else:
-                    # malformed line
-                    pass
+        (millis0,epoch0),(millis1,epoch1) = get_epoch_to_milis_relation(infile)
+
+        # Split the lines once; the header is passed through and of the data
+        # lines only those with two entries (as expected) are kept - the
+        # last line can be empty, or lines may be malformed.
+        outlines = [ line for line in lines if 'millis' in line ]
+        data     = [ line.strip().split(',') for line in lines
+                     if not 'millis' in line ]
+        data     = [ entry for entry in data if len(entry) == 2 ]
+        millis   = np.array( [ int(entry[0]) for entry in data ],dtype=np.int64 )
+
+        # Look at the deltas, millis should be monotonically increasing
+        # unless we hit roll-over, in which case the delta is wrapped
+        delta = np.diff( millis, prepend=0 )
+        delta[ delta < -4294000000 ] += max
+
+        # Convert the (roll-over corrected) millis to epochtime from mapping;
+        # truncation mirrors int() on a scalar
+        epoch = ( epoch0 + ( np.cumsum(delta) - millis0 ) \
+                * ( epoch1 - epoch0 ) / ( millis1 - millis0 ) ).astype(np.int64)
+        outlines.extend( str( value ) + ' , ' + entry[1]
+                         for value, entry in zip( epoch.tolist(), data ) )
 
         return '\n'.join(outlines) + '\n'
 
     import os
+    import io
     import gzip
+    import codecs
+    import contextlib
+    import concurrent.futures
     #
-
-    def modeDetection( path , filename ):
-        #
-        # Here we detect if we are in debug or in production mode, we do this
-        # based on the first few lines; in debug these will contain either
-        # FFT or SPEC, whereas in production only SPECA is encountered
-        import os
-        
-        mode = 'production'
-        with open(os.path.join( path,filename) ) as infile:
-            #
-            jline = 0 
-            for line in infile:
-                #
-                if ( line[0:3]=='FFT' or line[0:5]=='SPEC,'):
-                    mode = 'debug'
-                    break
-                jline = jline+1
-                
-                if jline>10:
-                    break
-        return(mode)
-    
-    def find_nth(haystack, needle, n):
-        #
-        # Function to find nth and nth-1 occurences of a needle in the haystack
-        #
-        start = haystack.find(needle)
-        prev  = start
-        while start >= 0 and n > 1:
-            #
-            prev  = start
-            start = haystack.find(needle, start+len(needle))
-            n -= 1
-            #
-        return (start,prev)
-        #
-    #end nested function
-    #        
+    # Block size used when copying (non-SPC) files to the output
+    chunkSize = 16 * 1024 * 1024
     #
     # Get a list of location filenames and the absolute path 
     path , fileNames = getFileNames( path=path , suffix=Suffix,
@@ -1299,130 +1548,150 @@ def cat( path = None, outputFileName = 'displacement.CSV', Suffix='FLT',
     #
     if compress:
         #
-        outfile = gzip.open(outputFileName,'wb')
+        # Buffer writes so that deflate is called on large blocks instead
+        # of on every (SPC) line
+        outfile = io.BufferedWriter(
+            gzip.GzipFile(outputFileName,'wb',compresslevel=6),
+            buffer_size=256*1024)
         #
     else:
         #
-        outfile = open(outputFileName,'w')
+        outfile = open(outputFileName,'wb',buffering=1<<20)
         #
     #
     #    
     #
-    for index,filename in enumerate(fileNames):
+    #
+    # The with statement closes the output file (and shuts down the worker
+    # pool) also when the loop below ends with an exception, e.g. one
+    # re-raised from a worker.
+    spectralLines = None
+    with outfile, contextlib.ExitStack() as stack:
         #
-        if reportProgress:
+        if Suffix == 'SPC' and len(fileNames) > 1:
             #
-            print( '- ' + filename + ' (File {} out of {})'.format(
-                index+1, len(fileNames) ) )
+            # Selecting the spectral lines is done line by line in python and
+            # is CPU bound; process the files in parallel, the results are
+            # written in order below. A single file is processed in this
+            # process, without paying for starting a pool.
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min( 8, len(fileNames) ) ) )
+            spectralLines = [ executor.submit( catSpectralFile, path,
+                                               filename, index==0 )
+                              for index,filename in enumerate(fileNames) ]
+            #
+            # If the loop ends early, files not yet picked up by a worker
+            # are not started
+            for future in spectralLines:
+                stack.callback( future.cancel )
             #
         #
-        
-        if Suffix == 'SPC':
+        for index,filename in enumerate(fileNames):
             #
-            ip = 0
-            prevLine = ''
-            mode = modeDetection( path, filename)
+            if reportProgress:
+                #
+                print( '- ' + filename + ' (File {} out of {})'.format(
+                    index+1, len(fileNames) ) )
+                #
             #
-
-            with open(os.path.join( path,filename) ) as infile:
-                try:        #
-                    #lines = infile.readlines()
-                    ii = 0
-                    line = infile.readline()
+            
+            if Suffix == 'SPC':
+                #
+                if spectralLines is None:
                     #
-                    if index==0:
-                        #
-                        outfile.write(line)
-
-                    for line in infile:
-                        #
-                        # Read the ensemble counter
-                        if (line[0:8]=='SPEC_AVG' or line[0:5]=='SPECA'
-                                 or line[0:8]=='SPECA_CC'):
-                            a,b=find_nth(line, ',', 5)
-                            ii = int(line[b+1 : a])
-                            #
-
-                            if mode=='production':
-                                #
-                                outfile.write(line)
-                                ip       = ii
-                                #
-                            else:
-                                #
-                                #
-                                # Debug spectral file, contains all averages,
-                                # only need last.
-                                #
-                                if line[0:8]=='SPECA_CC':
-                                    #
-                                    outfile.write(line)
-                                    ip = 0
-                                    #
-                                elif ii < ip:
-                                    #
-                                    outfile.write(prevLine)
-                                    ip = 0
-                                    #
-                                else:
-                                    #
-                                    ip       = ii
-                                    prevLine = line
-                                    #
-                                #end if
-                                #
-                            #end if
-                            #
-                        #end if
-                        #
-                    #end for line
+                    lines, corrupt = catSpectralFile( path, filename,
+                                                      index==0 )
                     #
-                except Exception as e:
+                else:
+                    #
+                    lines, corrupt = spectralLines[index].result()
+                    #
+                #
+                if corrupt:
                     message = "- ERROR:, file " + os.path.join( path,filename) + " is corrupt"
                     log_errors(message)
                     print(message )
-            #end with
-            #
-        else:
-            #
-            # Suffix is not 'SPC'
-            #
-            fqfn = os.path.join(path, filename)
-            with open(fqfn) as infile:
                 #
-                try:
-                    lines = infile.readlines()
-                except:
-                    message = "- ERROR:, file " + os.path.join( path,filename) + " is corrupt"
-                    log_errors(message)
-                    print(message)
-                else:
-                    # if this is the first file of this type, keep the header
-                    # otherwise, drop it
-
-                    if index > 0 and len(lines):
-                        unused_header = lines.pop(0)
-                        
+                outfile.write(lines)
+                #
+                #
+            else:
+                #
+                # Suffix is not 'SPC'
+                #
+                fqfn = os.path.join(path, filename)
+                with open(fqfn,'rb') as infile:
                     #
-                    # If SST file, map millis onto epochs
-                    if Suffix == 'SST':
-                        if compatibility_version < 3:
-                            lines = process_sst_lines(lines, fqfn)
-
-                    if compress:
+                    try:
                         #
-                        lines = [ line.encode('utf-8') for line in lines ]
+                        # SST files need all lines to map millis onto epochs
+                        if Suffix == 'SST' and compatibility_version < 3:
+                            #
+                            lines = infile.read().replace(b'\r',b'')
+                            lines = lines.decode('utf-8').splitlines(True)
+                            #
+                            # if this is the first file of this type, keep
+                            # the header otherwise, drop it
+                            if index > 0 and len(lines):
+                                unused_header = lines.pop(0)
+                            #
+                            # Map millis onto epochs
+                            lines = process_sst_lines(
+                                lines, fqfn).encode('utf-8')
+                            #
+                        else:
+                            #
+                            # Check that the whole file decodes before any of
+                            # it is written (below), so that a corrupt file
+                            # contributes nothing to the output. The
+                            # incremental decoder handles characters that
+                            # straddle block boundaries.
+                            decoder = codecs.getincrementaldecoder('utf-8')()
+                            for block in iter(
+                                    lambda: infile.read(chunkSize),b''):
+                                #
+                                decoder.decode(block)
+                                #
+                            #
+                            decoder.decode(b'',final=True)
+                            #
                         #
+                    except Exception:
+                        #
+                        # Only reading and decoding the input is guarded
+                        # here; errors writing the output propagate.
+                        message = "- ERROR:, file " + os.path.join( path,filename) + " is corrupt"
+                        log_errors(message)
+                        print(message)
                     else:
-                        # Strip dos newline char
-                        lines = [ line.replace('\r','') for line in lines ]
-
-                    outfile.writelines(lines)
-
+                        #
+                        if Suffix == 'SST' and compatibility_version < 3:
+                            #
+                            outfile.write(lines)
+                            #
+                        else:
+                            #
+                            # if this is the first file of this type, keep
+                            # the header otherwise, drop it
+                            infile.seek(0)
+                            if index > 0:
+                                unused_header = infile.readline()
+                            #
+                            # Stream the file in large blocks so memory use
+                            # is bounded; dropping carriage returns strips
+                            # dos newline chars
+                            for block in iter(
+                                    lambda: infile.read(chunkSize),b''):
+                                #
+                                outfile.write(block.replace(b'\r',b''))
+                                #
+                            #
+                        #
+                #
             #
         #
     #
-    outfile.close()
     return( True )
     #
 #end def
@@ -1482,18 +1751,16 @@ def getVersions( path ):
     # Get sys files
     path,fileNames = getFileNames( path , 'SYS' , 'system' )
     #
-    def latestVersion():
+    def newVersion( sha , IIRWeightType ):
         #
-        ordinal = - 1
-        for key in ordinalVersionNumber:
-            #
-            if ordinalVersionNumber[key][1] > ordinal:
-                #
-                latVer = key
-                #
-            #
+        # New entry in the version list for files written by firmware sha
         #
-        return(latVer)
+        return( {'sha':[sha],
+                 'version':[supportedVersions[sha]],
+                 'ordinal':[ordinalVersionNumber[sha]],
+                 'number':ordinalVersionNumber[sha][1],
+                 'IIRWeightType':IIRWeightType,
+                 'fileNumbers':[] } )
         #
     #end def
     #
@@ -1507,17 +1774,18 @@ def getVersions( path ):
         foundIIRWeightType = False
         IIRWeightType = defaultIIRWeightType
         #
-        #Check if there is a sha in first 80 lines
-        with open(os.path.join( path,filename) ) as infile:
+        #Check if there is a sha in first 80 lines; lines are scanned as
+        #bytes, only the matching lines are decoded
+        with open(os.path.join( path,filename) , 'rb' ) as infile:
             #
             jline = 0
             for line in infile:
-                if 'SHA' in line:
-                    sha = line.split(':')
-                    sha = sha[-1].strip()
+                if b'SHA' in line:
+                    sha = line.split(b':')
+                    sha = sha[-1].strip().decode('ascii','replace')
                     foundSha = True
-                elif 'iir weight type' in line:
-                    ___ , IIRWeightType = line.split(':')
+                elif b'iir weight type' in line:
+                    ___ , IIRWeightType = line.split(b':')
                     IIRWeightType = int(IIRWeightType.strip())
                     foundIIRWeightType = True
                     #
@@ -1535,7 +1803,7 @@ def getVersions( path ):
             if not sha in ordinalVersionNumber:
                 #
                 # If not - parse using the latest version
-                sha = latestVersion()
+                sha = latestSha
             #
 
         #
@@ -1544,12 +1812,7 @@ def getVersions( path ):
             #
             # this the first file, and we found a sha
             #
-            version.append( {'sha':[sha],
-                             'version':[supportedVersions[sha]],
-                             'ordinal':[ordinalVersionNumber[sha]],
-                             'number':ordinalVersionNumber[sha][1],
-                             'IIRWeightType':IIRWeightType,
-                             'fileNumbers':[] })
+            version.append( newVersion( sha , IIRWeightType ) )
             first = False            
             #
         elif not foundSha and first:
@@ -1558,13 +1821,8 @@ def getVersions( path ):
             # under the assumption that the version corresponds to the
             # latest version - may lead to problems in older version
             print('WARNING: Cannot determine version number')
-            sha = latestVersion()
-            version.append( {'sha':[sha],
-                             'version':[supportedVersions[sha]],
-                             'ordinal':[ordinalVersionNumber[sha]],
-                             'number':ordinalVersionNumber[sha][1],
-                             'IIRWeightType':IIRWeightType,
-                             'fileNumbers':[] })
+            sha = latestSha
+            version.append( newVersion( sha , IIRWeightType ) )
             first = False
             #
         elif foundSha and not first:
@@ -1588,12 +1846,7 @@ def getVersions( path ):
                     #
                     # Not Compatible, we add a new version to the version list
                     # that has to be processed seperately
-                    version.append( {'sha':[sha],
-                                     'version':[supportedVersions[sha]],
-                                     'ordinal':[ordinalVersionNumber[sha]],
-                                     'number':ordinalVersionNumber[sha][1],
-                                     'IIRWeightType':IIRWeightType,
-                                     'fileNumbers':[] })
+                    version.append( newVersion( sha , IIRWeightType ) )
                     #                             
                 #
             #
@@ -1609,10 +1862,13 @@ def getVersions( path ):
     #
     return version
 #
+@functools.lru_cache(maxsize=None)
 def filterSOS(versionNumber,IIRWeightType):
     #
     import numpy as np
-    #second order-sections coeficients of the filter
+    #second order-sections coeficients of the filter; these only depend on
+    #the arguments, so results are cached (the returned array is shared
+    #between callers and should not be modified)
 
     if versionNumber < 1:
         #
@@ -1702,7 +1958,7 @@ def applyfilter( data , kind , versionNumber, IIRWeightType ):
 
     return res
 
-First = True
+errorFile = None
 if __name__ == "__main__":
     #
     # execute only if run as a script
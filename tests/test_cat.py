@@ -11,7 +11,7 @@ import time
 import unittest
 
 from math import ceil
-from sd_file_parser import cat
+from sd_file_parser import cat, catSpectralFile
 
 class CatTest(unittest.TestCase):
     def testCatSst(self):
@@ -20,6 +20,21 @@ class CatTest(unittest.TestCase):
             outputFileName = os.path.join(self.outputpath, self.outFiles[suffix] + '.csv')
             result = cat(path=self.inputpath, Suffix=suffix)
 
+    def testCatSpcCorruptLine(self):
+        """
+        an SPC file with an invalid byte in a retained line is flagged as
+        corrupt, and the invalid line is not retained
+        """
+        with open(os.path.join(self.inputpath, '0235_SPC.CSV'), 'rb') as file:
+            lines = file.readlines()
+        lines[39] = lines[39].replace(b'SPECA,', b'SPECA,\xff\xfe', 1)
+        with open(os.path.join(self.outputpath, '0236_SPC.CSV'), 'wb') as file:
+            file.writelines(lines)
+
+        retained, corrupt = catSpectralFile(self.outputpath, '0236_SPC.CSV', False)
+        self.assertTrue(corrupt)
+        retained.decode('utf-8')
+
     def setUp(self):
         """
         prepare for running the parser
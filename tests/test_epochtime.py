@@ -22,7 +22,18 @@ class EpochToDateArrayTest(unittest.TestCase):
         converted = epochToDateArray(self.epochTimeDecimals)
         # print(converted)
         self.assertSequenceEqual(converted.tolist(), [ [2022, 10, 26, 18, 31, 38, 0] ])
-        
+
+    def testFractionalSeconds(self):
+        """
+        test that seconds are truncated (as time.gmtime does) and the
+        remainder ends up in the milliseconds column
+        """
+        converted = epochToDateArray([ 1610720358.40, 1610720359.99 ])
+        self.assertSequenceEqual(converted[:,0:6].tolist(),
+            [ [2021, 1, 15, 14, 19, 18], [2021, 1, 15, 14, 19, 19] ])
+        self.assertAlmostEqual(converted[0,6], 400., places=3)
+        self.assertAlmostEqual(converted[1,6], 990., places=3)
+
     def setUp(self):
         self.epochTimeDecimal1 = 1666809098.00        
         self.epochTimeDecimals = [ self.epochTimeDecimal1 ]
@@ -11,7 +11,7 @@ import time
 import unittest
 
 from math import ceil
-from sd_file_parser import parseSpectralFiles
+from sd_file_parser import parseSpectralFiles, Spectrum
 
 class SpectralParsingTest(unittest.TestCase):
 
@@ -37,6 +37,16 @@ class SpectralParsingTest(unittest.TestCase):
         # only Szz gets created by default (see lines 827-829)
         self.assertTrue( os.path.exists( os.path.join( self.outputpath, 'Szz.csv' ) ) )
 
+    def testSpectrumHeaderWithoutSzz(self):
+        """
+        frequencies are read from the first available parser output,
+        not only from Szz.csv
+        """
+        parseSpectralFiles( inputFileName = self.inputfn, outputPath = self.outputpath,
+            outputSpectra = ['a1'] )
+        spectrum = Spectrum( path=self.outputpath, outpath=self.outputpath )
+        self.assertEqual( len( spectrum.f ), 128 )
+
     def setUp(self):
         """
         prepare for running the parser